@@ -1,17 +1,104 @@
-from typing import Annotated, List, TypedDict, Union
+import logging
+import os
+import re
+from typing import Annotated, List, Optional, Tuple, TypedDict, Union
 from dotenv import load_dotenv
+from langchain.globals import set_llm_cache
+from langchain_community.cache import RedisCache, RedisSemanticCache
+from langchain_core.caches import RETURN_VAL_TYPE, BaseCache
+from langchain_core.load import loads
 from langchain_core.messages import AIMessage,SystemMessage,HumanMessage
-from langchain_core.prompts import ChatPromptTemplate
-from langchain_google_genai.chat_models import ChatGoogleGenerativeAI
+from langchain_google_genai import GoogleGenerativeAIEmbeddings
 from langgraph.graph import END, START, StateGraph
 from langgraph.prebuilt import ToolNode, tools_condition
 import operator
-from app.tools.uniprot_tools import uniprot_search, uniprot_get_fasta, uniprot_get_data
+from app.llm import get_llm
+from app.tools.uniprot_tools import uniprot_search, uniprot_get_fasta, uniprot_get_data, uniprot_get_many
 
 from langserve.pydantic_v1 import BaseModel, Field
+from redis import Redis
 
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
+
+# UniProt accessions (https://www.uniprot.org/help/accession_numbers) and entry names.
+IDENTIFIER = re.compile(
+    r"\b(?:[OPQ][0-9][A-Z0-9]{3}[0-9]|[A-NR-Z][0-9](?:[A-Z][A-Z0-9]{2}[0-9]){1,2})\b"
+    r"|\b[A-Z0-9]{1,5}_[A-Z0-9]{1,5}\b",
+    re.IGNORECASE,
+)
+
+
+class QuestionCache(BaseCache):
+    """LLM cache keyed on the user's question instead of the whole serialized prompt.
+
+    LangChain keys chat-model lookups on the full conversation, whose embedding is
+    dominated by the fixed system message, so unrelated questions would match each
+    other. Only the opening turn of a single-question conversation is cached: later
+    turns depend on earlier answers and tool results, not just on the question.
+
+    Questions naming a UniProt identifier only hit on an exact match, since
+    "FASTA for P38398" and "FASTA for P01308" embed almost identically. Cache
+    errors are logged and treated as misses, so an outage never fails a turn.
+    """
+
+    def __init__(self, semantic: BaseCache, exact: BaseCache):
+        self.semantic = semantic
+        self.exact = exact
+
+    def _route(self, prompt: str) -> Optional[Tuple[BaseCache, str]]:
+        messages = loads(prompt)
+        if any(not isinstance(m, (SystemMessage, HumanMessage)) for m in messages):
+            return None
+        questions = [m.content for m in messages if isinstance(m, HumanMessage)]
+        if len(questions) != 1 or not isinstance(questions[0], str):
+            return None
+        question = questions[0]
+        return (self.exact if IDENTIFIER.search(question) else self.semantic), question
+
+    def lookup(self, prompt: str, llm_string: str) -> Optional[RETURN_VAL_TYPE]:
+        try:
+            route = self._route(prompt)
+            if route is None:
+                return None
+            cache, question = route
+            return cache.lookup(question, llm_string)
+        except Exception:
+            logger.warning("LLM cache lookup failed, calling the model", exc_info=True)
+            return None
+
+    def update(self, prompt: str, llm_string: str, return_val: RETURN_VAL_TYPE) -> None:
+        try:
+            route = self._route(prompt)
+            if route is not None:
+                cache, question = route
+                cache.update(question, llm_string, return_val)
+        except Exception:
+            logger.warning("LLM cache update failed", exc_info=True)
+
+    def clear(self, **kwargs) -> None:
+        self.semantic.clear(**kwargs)
+        self.exact.clear(**kwargs)
+
+
+def setup_llm_caching():
+    """Serve repeated questions from a Redis-backed LLM cache, if REDIS_URL is set."""
+    redis_url = os.getenv("REDIS_URL")
+    if not redis_url:
+        return
+    set_llm_cache(
+        QuestionCache(
+            semantic=RedisSemanticCache(
+                redis_url=redis_url,
+                embedding=GoogleGenerativeAIEmbeddings(model="models/embedding-001"),
+                score_threshold=0.15,
+            ),
+            exact=RedisCache(Redis.from_url(redis_url)),
+        )
+    )
+
 class InputChat(BaseModel):
     """Input for the chat endpoint."""
 
@@ -26,34 +113,35 @@ class ChatState(TypedDict):
 
 toolbox = [uniprot_search, 
            uniprot_get_fasta, 
-           uniprot_get_data
+           uniprot_get_data,
+           uniprot_get_many
         ]
 
-llm  = ChatGoogleGenerativeAI(temperature=1, model="gemini-1.5-pro")
-llm_with_tools = llm.bind_tools(toolbox) 
+llm_with_tools = get_llm().bind_tools(toolbox) 
 
-messages = [
-    SystemMessage(content="""Your name is co-scienza and you are a helpful assistant for common retrieval tools.
+# The system prompt never changes, so build it once instead of formatting a template every turn.
+SYSTEM_MESSAGE = SystemMessage(content="""Your name is co-scienza and you are a helpful assistant for common retrieval tools.
     
     - You are friendly and always perform the needed parameter conversion to use tools.
       Example:
       The user provides "XXXX", but the tool needs a list of string. You convert the parameter to ["XXXX"]
     
     If you lack some parameter to use a tool, ask it to the user and then perform the call.
+
+    When you need several independent tool results, request all the tool calls in the same turn instead of one per turn.
+    When you need more than one UniProt entry, fetch them all with a single uniprot_get_many call instead of one uniprot_get_fasta call per ID.
     
     Always interpret the output of the tools and provide a nice description.
-    """), 
-    ("placeholder", "{messages}")                
-]
-prompt = ChatPromptTemplate.from_messages(messages=messages)  
-chain = prompt | llm_with_tools
+    """)
 
 
-def chatbot(state: ChatState) -> ChatState: 
-    message = chain.invoke(input=state)
-    print("Message:",message, end="\n\n")
+async def chatbot(state: ChatState) -> ChatState: 
+    message = await llm_with_tools.ainvoke([SYSTEM_MESSAGE, *state["messages"]])
+    logger.debug("Message: %s", message)
     return {'messages':[message]}
 
+# The tools are coroutines and the graph runs through ainvoke, so ToolNode
+# awaits all tool calls of a turn concurrently.
 tool_node = ToolNode(tools=toolbox)
 
 graph_builder = StateGraph(ChatState)
@@ -74,6 +162,6 @@ graph = graph_builder.compile()
 
 
 # Define a custom chain to handle input and invoke the graph
-def agent_chain(message: InputChat) -> str:
-    response = graph.invoke(input=message)
+async def agent_chain(message: InputChat) -> str:
+    response = await graph.ainvoke(input=message)
     return response['messages'][-1].content
\ No newline at end of file
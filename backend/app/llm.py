@@ -0,0 +1,11 @@
+from functools import cache
+from dotenv import load_dotenv
+from langchain_google_genai.chat_models import ChatGoogleGenerativeAI
+
+load_dotenv()
+
+
+@cache
+def get_llm() -> ChatGoogleGenerativeAI:
+    """Return the process-wide Gemini chat model, created on first use."""
+    return ChatGoogleGenerativeAI(temperature=1, model="gemini-1.5-pro")
@@ -1,11 +1,22 @@
 from fastapi import FastAPI
 from fastapi.responses import RedirectResponse
 from langserve import add_routes
-from app.agent import agent_chain, InputChat
+from app.agent import agent_chain, InputChat, setup_llm_caching
+from app.tools.uniprot_tools import get_client
 from langchain_core.runnables import RunnableLambda
 app = FastAPI()
 
 
+@app.on_event("startup")
+async def enable_llm_cache():
+    setup_llm_caching()
+
+
+@app.on_event("shutdown")
+async def close_http_client():
+    await get_client().aclose()
+
+
 @app.get("/")
 async def redirect_root_to_docs():
     return RedirectResponse("/docs")
@@ -21,6 +32,24 @@ add_routes(
 )
 
 if __name__ == "__main__":
+    import copy
+    import os
     import uvicorn
+    from uvicorn.config import LOGGING_CONFIG
+
+    # Route the app's own loggers through uvicorn's handler at INFO, so debug
+    # messages on the request path are dropped before being formatted.
+    log_config = copy.deepcopy(LOGGING_CONFIG)
+    log_config["loggers"]["app"] = {"handlers": ["default"], "level": "INFO", "propagate": False}
 
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+    # Workers need an import string rather than the app object so each one can load it.
+    uvicorn.run(
+        "app.server:app",
+        host="0.0.0.0",
+        port=8000,
+        workers=int(os.getenv("WORKERS", min(os.cpu_count() or 1, 4))),
+        loop="uvloop",
+        http="httptools",
+        log_level="info",
+        log_config=log_config,
+    )
@@ -1,19 +1,15 @@
-from app.tools.uniprot_tools import uniprot_search, uniprot_get_fasta, uniprot_get_data
-from dotenv import load_dotenv
+import asyncio
+from app.llm import get_llm
+from app.tools.uniprot_tools import uniprot_search, uniprot_get_fasta, uniprot_get_data, uniprot_get_many
 from langchain.agents import initialize_agent, AgentType
-from langchain_google_genai.chat_models import ChatGoogleGenerativeAI
-
-load_dotenv()
-
-llm  = ChatGoogleGenerativeAI(temperature=1, model="gemini-1.5-pro")
 
 # Create a list of tools
-tools = [uniprot_search, uniprot_get_fasta, uniprot_get_data]
+tools = [uniprot_search, uniprot_get_fasta, uniprot_get_data, uniprot_get_many]
 
-# Initialize the agent
-agent = initialize_agent(tools, llm, agent=AgentType.ZERO_SHOT_REACT_DESCRIPTION, verbose=True)
 # Example usage
 if __name__ == "__main__":
+    # Initialize the agent
+    agent = initialize_agent(tools, get_llm(), agent=AgentType.ZERO_SHOT_REACT_DESCRIPTION, verbose=True)
     # Use the agent
-    result = agent.run("Search for the protein insulin in humans and get its FASTA sequence")
-    print(result)
\ No newline at end of file
+    result = asyncio.run(agent.arun("Search for the protein insulin in humans and get its FASTA sequence"))
+    print(result)
@@ -1,26 +1,151 @@
 from __future__ import annotations
-from bioservices import UniProt
+import asyncio
+import httpx
+import orjson
+from async_lru import alru_cache
+from cachetools import TTLCache
 from langchain.tools import tool
-from langchain.pydantic_v1 import BaseModel, Field
-from typing import List, Union, Dict
+from langchain.pydantic_v1 import BaseModel, Field, validator
+from tenacity import retry, retry_if_exception, stop_after_attempt, wait_random_exponential
+from typing import List, Literal, Union, Dict
+
+# Up to this many IDs are fetched with one concurrent GET each; above it the
+# batch accessions endpoint is used, ACCESSIONS_PER_REQUEST IDs at a time.
+BATCH_THRESHOLD = 25
+ACCESSIONS_PER_REQUEST = 100
+
+# Searches return one page of hits; UniProt caps a page at 500 entries.
+SEARCH_SIZE = 25
+MAX_SEARCH_SIZE = 500
+
+_client: httpx.AsyncClient | None = None
+
+
+def get_client() -> httpx.AsyncClient:
+    """Return the shared async UniProt client, creating it on first use."""
+    global _client
+    if _client is None or _client.is_closed:
+        _client = httpx.AsyncClient(
+            base_url="https://rest.uniprot.org",
+            transport=httpx.AsyncHTTPTransport(
+                http2=True,
+                limits=httpx.Limits(max_connections=50, max_keepalive_connections=20),
+            ),
+            # httpx advertises every encoding it can decode (br via the brotli extra).
+            headers={"User-Agent": "co-scienza/1.0"},
+            timeout=30,
+            # Secondary and merged accessions answer with a redirect to the primary entry.
+            follow_redirects=True,
+        )
+    return _client
+
+
+def _is_transient(exc: BaseException) -> bool:
+    if isinstance(exc, httpx.HTTPStatusError):
+        return exc.response.status_code in (500, 502, 503, 504)
+    # A timeout has already cost the full timeout; retrying it would only multiply that.
+    return isinstance(exc, httpx.TransportError) and not isinstance(exc, httpx.TimeoutException)
+
+
+# Give a flapping upstream a few quick, jittered retries; the waits are
+# awaited, so other requests keep being served meanwhile.
+@retry(
+    retry=retry_if_exception(_is_transient),
+    stop=stop_after_attempt(3),
+    wait=wait_random_exponential(multiplier=0.1, max=1.5),
+    reraise=True,
+)
+async def _get(url: str, **kwargs) -> httpx.Response:
+    response = await get_client().get(url, **kwargs)
+    response.raise_for_status()
+    return response
+
+
+# UniProt entries do not change within a session, so repeated lookups of the
+# same accession are served from memory instead of going back to the server.
+@alru_cache(maxsize=4096)
+async def _fetch_entry(accession_id: str, fields: str = None) -> bytes:
+    params = {"fields": fields} if fields else {}
+    response = await _get(f"/uniprotkb/{accession_id}.json", params=params)
+    return response.content
+
+
+@alru_cache(maxsize=4096)
+async def _fetch_fasta(uniprot_id: str) -> str:
+    response = await _get(f"/uniprotkb/{uniprot_id}.fasta")
+    return response.text
+
+
+async def _get_accessions(accessions: List[str], params: Dict) -> List[httpx.Response]:
+    """Fetch many entries from the batch accessions endpoint, a chunk per request."""
+    chunks = [accessions[i:i + ACCESSIONS_PER_REQUEST]
+              for i in range(0, len(accessions), ACCESSIONS_PER_REQUEST)]
+    return await asyncio.gather(
+        # The endpoint pages its results (25 by default); ask for the whole chunk at once.
+        *(_get("/uniprotkb/accessions", params={**params, "accessions": ",".join(chunk), "size": len(chunk)})
+          for chunk in chunks)
+    )
+
+
+def _check_complete(requested: List[str], returned: List[str]) -> None:
+    """Fail loudly, naming the missing accessions, instead of handing back a partial batch."""
+    if len(returned) != len(requested):
+        found = set(returned)
+        missing = [accession for accession in requested if accession not in found]
+        raise ValueError(
+            f"UniProt returned {len(returned)} of the {len(requested)} requested entries; "
+            f"missing (obsolete, deleted or invalid): {', '.join(missing)}. "
+            "Retry without them to get the others."
+        )
+
+
+def _accessions_in(records: List[Dict]) -> List[str]:
+    """Primary accessions of the given JSON records, one per record."""
+    return [record["primaryAccession"] for record in records]
+
+
+# Search hits can change between releases, so keep them for a day at most.
+_search_cache = TTLCache(maxsize=2048, ttl=24 * 3600)
+
+
+def _as_list(value):
+    """Let the model pass a single ID where the schema expects a list."""
+    return [value] if isinstance(value, str) else value
+
+
+def _split_columns(value):
+    """Accept columns as a comma-separated string as well as a list."""
+    if isinstance(value, str):
+        return [column.strip() for column in value.split(",") if column.strip()]
+    return value
 
-uniprot = UniProt(verbose=False)
 
 class SearchInput(BaseModel):
     query: str = Field(description="UniProt search query")
     frmt: str = Field(default="tsv", description="Output format (tsv, fasta, json)")
-    columns: str = Field(default=None, description="Columns to retrieve")
-    limit: int = Field(default=None, description="Limit the number of results")
+    columns: List[str] = Field(default=None, description="Columns to retrieve")
+    limit: int = Field(default=SEARCH_SIZE, description=f"Limit the number of results (at most {MAX_SEARCH_SIZE})")
+
+    _columns = validator("columns", pre=True, allow_reuse=True)(_split_columns)
 
 class GetFastaInput(BaseModel):
     uniprot_id: str = Field(description="A valid UniProt ID")
 
 class GetDataInput(BaseModel):
-    uniprot_ids: str = Field(description="UniProt ID(s) to retrieve data for")
-    columns: str = Field(default=None, description="Columns to retrieve")
+    uniprot_ids: List[str] = Field(description="UniProt ID(s) to retrieve data for")
+    columns: List[str] = Field(default=None, description="Columns to retrieve")
+
+    _wrap_ids = validator("uniprot_ids", pre=True, allow_reuse=True)(_as_list)
+    _columns = validator("columns", pre=True, allow_reuse=True)(_split_columns)
+
+class GetManyInput(BaseModel):
+    accessions: List[str] = Field(description="UniProt IDs to retrieve")
+    fmt: Literal["fasta", "json"] = Field(default="fasta", description="Output format (fasta, json)")
+
+    _wrap_ids = validator("accessions", pre=True, allow_reuse=True)(_as_list)
 
 @tool("uniprot_search", args_schema=SearchInput)
-def uniprot_search(query: str, frmt: str = "tsv", columns: str = None, limit: int = None) -> str:
+async def uniprot_search(query: str, frmt: str = "tsv", columns: List[str] = None, limit: int = SEARCH_SIZE) -> str:
     """
     Perform a search query on UniProt.
 
@@ -30,16 +155,35 @@ def uniprot_search(query: str, frmt: str = "tsv", columns: str = None, limit: in
     Args:
         query (str): UniProt search query
         frmt (str): Output format (tsv, fasta, json)
-        columns (str): Columns to retrieve
+        columns (List[str]): Columns to retrieve
         limit (int): Limit the number of results
 
     Returns:
-        str: Search results in the specified format
+        str: A line with the number of results shown and found, then the results in the specified format
     """
-    return uniprot.search(query, frmt=frmt, columns=columns, limit=limit)
+    # Only the first page is ever read, so never ask for more than fits on it.
+    requested = limit or SEARCH_SIZE
+    size = min(requested, MAX_SEARCH_SIZE)
+    params = {"query": query, "format": frmt, "size": size}
+    if columns:
+        params["fields"] = ",".join(columns)
+    key = (query, frmt, params.get("fields"), size)
+    cached = _search_cache.get(key)
+    if cached is None:
+        response = await _get("/uniprotkb/search", params=params)
+        total = int(response.headers.get("x-total-results", 0))
+        cached = (total, response.text)
+        _search_cache[key] = cached
+    total, results = cached
+
+    # Tell the model how much of the result set it is looking at.
+    summary = f"Showing {min(size, total)} of {total} results."
+    if requested > size:
+        summary += f" The limit of {requested} was reduced to the maximum of {MAX_SEARCH_SIZE}."
+    return f"{summary}\n{results}"
 
 @tool("uniprot_get_fasta", args_schema=GetFastaInput)
-def uniprot_get_fasta(uniprot_id: str) -> str:
+async def uniprot_get_fasta(uniprot_id: str) -> str:
     """
     Retrieve the FASTA sequence for a given UniProt ID.
 
@@ -49,43 +193,99 @@ def uniprot_get_fasta(uniprot_id: str) -> str:
     Returns:
         str: FASTA sequence
     """
-    return uniprot.get_fasta(uniprot_id)
+    return await _fetch_fasta(uniprot_id)
 
 @tool("uniprot_get_data", args_schema=GetDataInput)
-def uniprot_get_data(uniprot_ids: str, columns: str = None) -> Dict:
+async def uniprot_get_data(uniprot_ids: List[str], columns: List[str] = None) -> Dict:
     """
     Retrieve data for given UniProt ID(s).
 
     Args:
-        uniprot_ids (str): UniProt ID(s) to retrieve data for
-        columns (str): Columns to retrieve
+        uniprot_ids (List[str]): UniProt ID(s) to retrieve data for
+        columns (List[str]): Columns to retrieve
+
+    Returns:
+        Dict: Data for the specified UniProt IDs, keyed by primary accession
+    """
+    params = {}
+    if columns:
+        params["fields"] = ",".join(columns)
+
+    if len(uniprot_ids) <= BATCH_THRESHOLD:
+        entries = await asyncio.gather(
+            *(_fetch_entry(uniprot_id, params.get("fields")) for uniprot_id in uniprot_ids)
+        )
+        records = (orjson.loads(entry) for entry in entries)
+        return {record["primaryAccession"]: record for record in records}
+
+    # Past a handful of IDs, let UniProt return many records per request.
+    uniprot_ids = list(dict.fromkeys(uniprot_ids))
+    results = [record
+               for response in await _get_accessions(uniprot_ids, params)
+               for record in orjson.loads(response.content)["results"]]
+    _check_complete(uniprot_ids, _accessions_in(results))
+    return {record["primaryAccession"]: record for record in results}
+
+@tool("uniprot_get_many", args_schema=GetManyInput)
+async def uniprot_get_many(accessions: List[str], fmt: Literal["fasta", "json"] = "fasta") -> Union[str, Dict]:
+    """
+    Retrieve several UniProt entries at once, as FASTA or JSON.
+
+    Prefer this tool over repeated uniprot_get_fasta calls whenever more than one ID is needed.
+
+    Args:
+        accessions (List[str]): UniProt IDs to retrieve
+        fmt (str): Output format (fasta, json)
 
     Returns:
-        Dict: Data for the specified UniProt IDs
+        Union[str, Dict]: Concatenated FASTA sequences, or JSON records keyed by accession
     """
-    if isinstance(uniprot_ids, str):
-        uniprot_ids = [uniprot_ids]
-    
-    return uniprot.get_df(uniprot_ids, columns=columns)
+    accessions = list(dict.fromkeys(accessions))
+
+    responses = await _get_accessions(accessions, {"format": fmt})
+    if fmt == "fasta":
+        fasta = "".join(response.text for response in responses)
+        # Headers look like ">sp|P38398|BRCA1_HUMAN ..."; the accession is the second field.
+        _check_complete(accessions, [line.split("|")[1] if line.count("|") >= 2 else line[1:].split()[0]
+                                     for line in fasta.splitlines() if line.startswith(">")])
+        return fasta
+
+    results = [record
+               for response in responses
+               for record in orjson.loads(response.content)["results"]]
+    _check_complete(accessions, _accessions_in(results))
+    return {record["primaryAccession"]: record for record in results}
 
 
 # Example usage
-if __name__ == "__main__":
+async def main():
 # Example search    
-    search_results = uniprot_search.invoke(input={"query":"insulin AND organism_name:human", 
-                                                  "frmt":"tsv",
-                                                  "columns":["id","accession","length","gene_names"]
-                                                  })
+    search_results = await uniprot_search.ainvoke(input={"query":"insulin AND organism_name:human", 
+                                                         "frmt":"tsv",
+                                                         "columns":["id","accession","length","gene_names"]
+                                                         })
     print("\nSearch Results:")
     #print(search_results)
 
 # Example get_fasta
-    fasta_sequence = uniprot_get_fasta.invoke(input={'uniprot_id':"P38398"})
+    fasta_sequence = await uniprot_get_fasta.ainvoke(input={'uniprot_id':"P38398"})
     print("\nFASTA Sequence for P38398 (BRCA1_HUMAN):")
     print(fasta_sequence)
 
 # Example get_data
-    data = uniprot_get_data.invoke(input={'uniprot_ids':"P38398", 
-                                          'columns':["Entry","Entry Name","Sequence"]})
+    data = await uniprot_get_data.ainvoke(input={'uniprot_ids':["P38398"], 
+                                                 'columns':["accession","id","sequence"]})
     print("\nData for P38398 (BRCA1_HUMAN):")
-    print(data)
\ No newline at end of file
+    print(data)
+
+# Example get_many
+    fasta_sequences = await uniprot_get_many.ainvoke(input={'accessions':["P38398", "P01308"],
+                                                           'fmt':"fasta"})
+    print("\nFASTA Sequences for P38398 (BRCA1_HUMAN) and P01308 (INS_HUMAN):")
+    print(fasta_sequences)
+
+    await get_client().aclose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())